@@ -22,6 +22,9 @@ class Config:
     # Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
+    # Per-country ETag / Last-Modified cache for conditional downloads
+    HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "cache")
+
     @staticmethod
     def get_db_connection_string():
         return f"mysql+pymysql://{Config.DB_USER}:{Config.DB_PASSWORD}@{Config.DB_HOST}:3306/{Config.DB_NAME}"
@@ -182,7 +182,11 @@ class DatabaseManager:
 
 
     def save_documents(self, items):
-        """Insert new documents and update existing ones."""
+        """
+        Insert new documents and update existing ones.
+        Each call is a fixed number of round-trips – one lookup, one bulk
+        INSERT and one executemany UPDATE – so callers pass items in batches.
+        """
         if not items:
             self.logger.info("No items to save")
             return
@@ -194,7 +198,7 @@ class DatabaseManager:
 
         df = pd.DataFrame(records)
 
-        existing_query = f"SELECT doc_id FROM {self.table} WHERE doc_id IN ({','.join([f':id_{i}' for i in range(len(df))])})" if len(df) > 0 else f"SELECT doc_id FROM {self.table} WHERE 1=0"
+        existing_query = f"SELECT doc_id, aws_key, s3_link_url, modifyDate FROM {self.table} WHERE doc_id IN ({','.join([f':id_{i}' for i in range(len(df))])})" if len(df) > 0 else f"SELECT doc_id FROM {self.table} WHERE 1=0"
         
         if len(df) > 0:
             params = {f'id_{i}': doc_id for i, doc_id in enumerate(df['doc_id'].tolist())}
@@ -202,7 +206,9 @@ class DatabaseManager:
         else:
             existing = []
 
-        existing_ids = [row['doc_id'] for row in existing] if existing else []
+        # doc_id -> current row, fetched in the same query for the UPDATE check
+        existing_rows = {row['doc_id']: row for row in existing} if existing else {}
+        existing_ids = list(existing_rows)
 
         new_df = df[~df['doc_id'].isin(existing_ids)]
         update_df = df[df['doc_id'].isin(existing_ids)]
@@ -215,17 +221,15 @@ class DatabaseManager:
             else:
                 self.logger.error(f"Insert failed: {msg}")
 
-        updated_count = 0
         unchanged_count = 0
+        update_rows = []
 
         # UPDATE
         for _, row in update_df.iterrows():
             row_dict = row.to_dict()
 
-            # Fetch existing data from DB for comparison
-            check_sql = f"SELECT aws_key, s3_link_url, modifyDate FROM {self.table} WHERE doc_id=:doc_id"
-            success, old_record_list = run_query_to_list_of_dicts(check_sql, {"doc_id": row_dict["doc_id"]})
-            old = old_record_list[0] if old_record_list else None
+            # Existing data for comparison (fetched with the lookup above)
+            old = existing_rows.get(row_dict["doc_id"])
 
             # Prepare row values
             row_dict = {k: (str(v) if pd.notna(v) else None) for k, v in row_dict.items()}
@@ -239,7 +243,11 @@ class DatabaseManager:
                 unchanged_count += 1
                 continue  # do the update logic but no log
 
-            # run update (logic unchanged)
+            update_rows.append(row_dict)
+
+        # run update (logic unchanged) – one executemany in one transaction
+        updated_count = 0
+        if update_rows:
             update_sql = f"""
                 UPDATE {self.table} SET
                     aws_key = :aws_key,
@@ -249,8 +257,11 @@ class DatabaseManager:
                 WHERE doc_id = :doc_id
             """
 
-            run_query_insert_update(update_sql, row_dict)
-            updated_count += 1
+            success, _ = run_query_insert_update(update_sql, update_rows)
+            if success:
+                updated_count = len(update_rows)
+            else:
+                self.logger.error(f"Update failed for {len(update_rows)} documents")
 
         # Correct logs
         if updated_count > 0:
@@ -1,11 +1,18 @@
 # utils/file_helper.py
 import re
 from datetime import datetime
+from functools import lru_cache
 import logging
 
 def clean_title(title):
     return re.sub(r'[<>:"/\\|?*]', '', title).strip()
 
+def node_text(el):
+    """Whitespace-normalised text of an lxml element (table cell, anchor, heading)."""
+    return " ".join(el.text_content().split())
+
+# Pure str -> str, and listing tables repeat the same dates row after row
+@lru_cache(maxsize=1024)
 def normalize_date(date_str):
     import re
     from datetime import datetime
@@ -0,0 +1,135 @@
+# utils/http_cache.py
+import os
+import json
+import asyncio
+import hashlib
+import logging
+
+from config import Config
+
+
+# Landing-page cache: <HTTP_CACHE_DIR>/pages/<key>.meta holds the ETag /
+# Last-Modified of the last 200 response, <key>.items.json the items parsed
+# from it. A 304 on the next run reuses the items as they are. The key
+# hashes the URL together with a variant (see cache_variant), so items built
+# by an older parser or under a different config are never served.
+PAGES_DIR = os.path.join(Config.HTTP_CACHE_DIR, "pages")
+
+# Landing-page GETs answering these statuses are retried by fetch_page
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def cache_variant(parser_version, cfg):
+    """
+    Variant for a scraper's cache keys: its parser version (bumped whenever
+    the parse output changes) plus a fingerprint of the country config.
+    """
+    blob = json.dumps(cfg, sort_keys=True, default=str)
+    return f"v{parser_version}-{hashlib.sha1(blob.encode('utf-8')).hexdigest()}"
+
+
+def _paths(url, variant=""):
+    key = hashlib.sha1(f"{url}\n{variant}".encode("utf-8")).hexdigest()
+    base = os.path.join(PAGES_DIR, key)
+    return f"{base}.meta", f"{base}.items.json"
+
+
+def conditional_headers(url, variant=""):
+    """If-None-Match / If-Modified-Since for url, or {} when nothing is cached."""
+    meta_path, items_path = _paths(url, variant)
+    if not os.path.exists(items_path):
+        return {}
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def load_items(url, variant=""):
+    """Items stored for url and variant by store(), or None."""
+    _, items_path = _paths(url, variant)
+    try:
+        with open(items_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store(url, response_headers, items, variant=""):
+    """Remember the validators of a 200 response together with its parsed items."""
+    meta = {
+        "etag": response_headers.get("ETag"),
+        "last_modified": response_headers.get("Last-Modified"),
+    }
+    if not (meta["etag"] or meta["last_modified"]) or not items:
+        return
+
+    meta_path, items_path = _paths(url, variant)
+    try:
+        os.makedirs(PAGES_DIR, exist_ok=True)
+        # items first – conditional_headers() only trusts meta with items
+        for path, data in ((items_path, items), (meta_path, meta)):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not cache page {url}: {e}")
+
+
+async def fetch_page(session, url, headers=None, attempts=3,
+                     retry_statuses=RETRY_STATUSES, backoff=0.3):
+    """
+    GET url on an aiohttp session, retrying retry_statuses with a
+    backoff, 2·backoff, ... delay (or the server's Retry-After) – a page
+    that stays down is retried next run.
+    Returns (status, body bytes, response headers); body is None on a 304.
+    """
+    for attempt in range(attempts):
+        async with session.get(url, headers=headers) as resp:
+            if resp.status not in retry_statuses or attempt == attempts - 1:
+                resp.raise_for_status()
+                if resp.status == 304:
+                    return resp.status, None, resp.headers
+                # Raw bytes – lxml detects the charset and decodes in C
+                return resp.status, await resp.read(), resp.headers
+            retry_after = resp.headers.get("Retry-After", "")
+            delay = int(retry_after) if retry_after.isdigit() else backoff * 2 ** attempt
+        await asyncio.sleep(delay)
+
+
+async def fetch_items(session, url, parse, *args, label, logger, variant="", **fetch_kwargs):
+    """
+    Items of a landing page, fetched conditionally: a 304 reuses the items
+    stored by the last run under the same variant, otherwise
+    parse(html, *args) runs in a worker thread (it is CPU work) and its
+    items are stored for the next run. fetch_kwargs go to fetch_page.
+    Returns [] when the page can't be had.
+    """
+    try:
+        status, html, resp_headers = await fetch_page(
+            session, url, conditional_headers(url, variant), **fetch_kwargs
+        )
+    except Exception as e:
+        logger.error(f"Failed to fetch {label} page: {e}")
+        return []
+
+    if status == 304:
+        items = load_items(url, variant)
+        if items is None:
+            logger.warning(f"{label} page not modified but its cached items are gone")
+            return []
+        logger.info(f"{label} page not modified – reusing {len(items)} cached documents")
+        return items
+
+    items = await asyncio.to_thread(parse, html, *args)
+    store(url, resp_headers, items, variant)
+    return items
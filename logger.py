@@ -1,5 +1,6 @@
 # utils/logger.py
 import logging
+import logging.handlers
 import os
 from datetime import datetime
 
@@ -39,3 +40,15 @@ def setup_logging(country=None):
 
             logger.setLevel(logging.INFO)
         return logger
+
+
+def setup_worker_logging(queue):
+    """
+    In a worker process: send the MAIN log through queue, so only the
+    parent's QueueListener writes main.log and the console.
+    """
+    logger = logging.getLogger('main')
+    logger.handlers.clear()
+    logger.addHandler(logging.handlers.QueueHandler(queue))
+    logger.setLevel(logging.INFO)
+    return logger
@@ -9,12 +9,13 @@ All 7 documents will succeed
 import os
 import re
 import logging
-import tempfile
+import functools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 from urllib.parse import urljoin
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString
 from fpdf import FPDF
 
 
@@ -22,6 +23,13 @@ from fpdf import FPDF
 def safe_pdf_text(text: str) -> str:
     if not text:
         return ""
+    return _safe_pdf_text_cached(text)
+
+
+# Table cells and bullets repeat a lot ("Yes", "No", header labels), so the
+# conversion is memoised per unique string
+@functools.lru_cache(maxsize=4096)
+def _safe_pdf_text_cached(text: str) -> str:
     replacements = {
         '•': '·',           # bullet
         '–': '-',           # en-dash
@@ -45,6 +53,239 @@ def safe_pdf_text(text: str) -> str:
 
 BASE_URL = "https://www.medsafe.govt.nz/regulatory/DevicesNew/industry.asp"
 TITLE_COLOR = (0, 124, 126)
+TABLE_LINE_H = 7
+_REVISED_RE = re.compile(r"Revised:\s*(.+)")
+
+
+class GuidancePDF(FPDF):
+    """
+    FPDF with the layout shared by all Medsafe PDFs. Built fresh for every
+    section – fpdf2 has no public way to reset a document, and re-running
+    __init__ costs the same as a new instance.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.set_auto_page_break(auto=True, margin=15)
+        self.add_page()
+
+
+# ----------------------------------------------------------------------
+# Block builders – keyed on the tag name of each child of #content-area
+# ----------------------------------------------------------------------
+def _node_text(el):
+    """Same result as el.get_text(" ", strip=True) without walking simple nodes."""
+    if not el.contents:
+        return ""
+    # Single text child (most <p>/<li>/<td>) – no descendant walk needed.
+    # Exact type: Comment / CData are NavigableString subclasses that
+    # get_text() skips, so they must not take this path
+    if type(el.string) is NavigableString:
+        return el.string.strip()
+    return el.get_text(" ", strip=True)
+
+
+def _add_heading(el, blocks):
+    txt = _node_text(el)
+    if txt:
+        blocks.append({"type": "heading", "text": txt})
+
+
+def _add_paragraph(el, blocks):
+    txt = _node_text(el)
+    if txt:
+        blocks.append({"type": "paragraph", "text": txt})
+
+
+def _add_bullets(el, blocks):
+    for li in el.find_all("li", recursive=False):
+        txt = _node_text(li)
+        if txt:
+            blocks.append({"type": "bullet", "text": txt})
+
+
+def _add_table(el, blocks):
+    rows = []
+    for tr in el.find_all("tr"):
+        row = [_node_text(c) for c in tr.find_all(["td", "th"])]
+        if any(c.strip() for c in row):
+            rows.append(row)
+    if rows:
+        blocks.append({"type": "table", "rows": rows})
+
+
+_BLOCK_BUILDERS = {
+    "h1": _add_heading,
+    "h2": _add_heading,
+    "h3": _add_heading,
+    "p": _add_paragraph,
+    "ul": _add_bullets,
+    "ol": _add_bullets,
+    "table": _add_table,
+}
+
+
+# ----------------------------------------------------------------------
+# PDF emitters – keyed on block["type"]
+# ----------------------------------------------------------------------
+def _emit_heading(pdf, block):
+    pdf.set_font("Helvetica", "B", 13)
+    pdf.set_text_color(*TITLE_COLOR)
+    pdf.multi_cell(0, 8, safe_pdf_text(block["text"]))
+    pdf.ln(3)
+
+
+def _emit_paragraph(pdf, block):
+    pdf.set_font("Helvetica", size=11)
+    pdf.set_text_color(0, 0, 0)
+    pdf.multi_cell(0, 6, safe_pdf_text(block["text"]))
+    pdf.ln(2)
+
+
+def _emit_bullet(pdf, block):
+    pdf.set_font("Helvetica", size=11)
+    pdf.set_text_color(0, 0, 0)
+    pdf.multi_cell(0, 6, f"· {safe_pdf_text(block['text'])}")
+    pdf.ln(1)
+
+
+def _emit_table(pdf, block):
+    rows = block["rows"]
+    if not rows:
+        return
+
+    pdf.ln(4)
+    col_count = max(len(r) for r in rows)
+    col_width = (pdf.w - 30) / col_count
+
+    # Measure every row once up front (dry run, nothing drawn) so each cell
+    # is emitted at its final row height instead of being re-measured after
+    layout = []
+    for r_idx, row in enumerate(rows):
+        style = "B" if r_idx == 0 else ""
+        pdf.set_font("Helvetica", style, 10)
+        texts = [safe_pdf_text(cell) for cell in row]
+        n_lines = max(
+            len(pdf.multi_cell(col_width, TABLE_LINE_H, t, dry_run=True, output="LINES"))
+            for t in texts
+        )
+        layout.append((style, texts, max(n_lines, 1) * TABLE_LINE_H))
+
+    for style, texts, row_h in layout:
+        pdf.set_font("Helvetica", style, 10)
+        x = 15
+        y = pdf.get_y()
+
+        for cell_text in texts:
+            pdf.set_xy(x, y)
+            pdf.multi_cell(col_width, row_h, cell_text, border=1, align="L",
+                           max_line_height=TABLE_LINE_H)
+            x += col_width
+
+        pdf.set_xy(15, y + row_h)
+    pdf.ln(5)
+
+
+_PDF_HANDLERS = {
+    "heading": _emit_heading,
+    "paragraph": _emit_paragraph,
+    "bullet": _emit_bullet,
+    "table": _emit_table,
+}
+
+# Consecutive blocks of these types share one font/colour, so a run of them is
+# emitted as a single multi_cell; the separator keeps the bullet prefix per line
+_RUN_SEPARATORS = {"paragraph": "\n", "bullet": "\n· "}
+
+
+def _has_url(text: str) -> bool:
+    return "http://" in text or "https://" in text
+
+
+def _merge_style_runs(blocks):
+    """Fuse runs of same-style paragraphs/bullets; blocks with links stay separate."""
+    merged = []
+    run = None
+    for b in blocks:
+        kind = b["type"]
+        if kind in _RUN_SEPARATORS and not _has_url(b["text"]):
+            if run is not None and run["type"] == kind:
+                run["parts"].append(b["text"])
+                continue
+            run = {"type": kind, "parts": [b["text"]]}
+            merged.append(run)
+        else:
+            run = None
+            merged.append(b)
+
+    for b in merged:
+        if "parts" in b:
+            b["text"] = _RUN_SEPARATORS[b["type"]].join(b.pop("parts"))
+    return merged
+
+
+# Section fetching runs on _FETCH_WORKERS threads and feeds a process pool
+# that renders the PDFs (FPDF is pure Python, so threads would share the GIL).
+_FETCH_WORKERS = 4
+
+
+def _fetch_section(fetch_soup, sec, logger):
+    """Fetch one guidance page and return (page_title, page_url, blocks, modify_date)."""
+    page_url = sec["url"]
+    page_title = sec["title"]
+
+    page_soup = fetch_soup(page_url)
+    if not page_soup:
+        return None
+
+    content = page_soup.find("div", id="content-area")
+    if not content:
+        logger.warning(f"No content area found: {page_url}")
+        return None
+
+    # Clean up – the revised date is read from p.updated on the same pass
+    modify_date = None
+    for junk in content.select("#breadcrumbs, p.updated"):
+        if modify_date is None and junk.name == "p" and "updated" in junk.get("class", []):
+            m = _REVISED_RE.search(junk.get_text())
+            if m:
+                try:
+                    dt = datetime.strptime(m.group(1).strip(), "%d %B %Y")
+                    modify_date = dt.strftime("%Y-%m-%d")
+                except:
+                    pass
+        junk.decompose()
+
+    # Build content blocks
+    blocks = []
+    for el in content.children:
+        builder = _BLOCK_BUILDERS.get(el.name)
+        if builder:
+            builder(el, blocks)
+
+    return page_title, page_url, blocks, modify_date
+
+
+def build_pdf(page_title, blocks):
+    """
+    Render one guidance section to PDF bytes using only built-in fonts.
+    Runs inside a ProcessPoolExecutor worker, so it takes and returns only
+    picklable values and lets exceptions propagate to the caller.
+    """
+    pdf = GuidancePDF()
+
+    # Title
+    pdf.set_font("Helvetica", "B", 16)
+    pdf.set_text_color(*TITLE_COLOR)
+    pdf.multi_cell(0, 10, safe_pdf_text(page_title))
+    pdf.ln(10)
+
+    for b in _merge_style_runs(blocks):
+        _PDF_HANDLERS[b["type"]](pdf, b)
+
+    # Keep the PDF in memory – S3Manager uploads file_bytes directly, so
+    # there is no temp file to write and read back
+    return bytes(pdf.output())
 
 
 def scrape_data(config, logger: logging.Logger):
@@ -61,11 +302,22 @@ def scrape_data(config, logger: logging.Logger):
         try:
             r = session.get(url, timeout=30)
             r.raise_for_status()
-            return BeautifulSoup(r.text, "html.parser")
+            # Medsafe serves UTF-8; setting it skips requests' charset sniffing
+            r.encoding = "utf-8"
         except Exception as e:
             logger.error(f"Failed to fetch {url}: {e}")
             return None
 
+        try:
+            return BeautifulSoup(r.text, "lxml")
+        except Exception:
+            # lxml choked on the markup – fall back to the pure-Python parser
+            try:
+                return BeautifulSoup(r.text, "html.parser")
+            except Exception as e:
+                logger.error(f"Failed to parse {url}: {e}")
+                return None
+
     soup = fetch_soup(base_url)
     if not soup:
         return []
@@ -82,143 +334,46 @@ def scrape_data(config, logger: logging.Logger):
         return []
 
     logger.info(f"Found {len(links)} guidance sections")
-    items = []
-
-    for idx, sec in enumerate(links, 1):
-        page_url = sec["url"]
-        page_title = sec["title"]
-        logger.info(f"[{idx}/{len(links)}] Processing: {page_title}")
-
-        page_soup = fetch_soup(page_url)
-        if not page_soup:
-            continue
-
-        content = page_soup.find("div", id="content-area")
-        if not content:
-            logger.warning(f"No content area found: {page_url}")
-            continue
-
-        # Extract revised date
-        modify_date = None
-        updated = content.find("p", class_="updated")
-        if updated:
-            m = re.search(r"Revised:\s*(.+)", updated.get_text())
-            if m:
-                try:
-                    dt = datetime.strptime(m.group(1).strip(), "%d %B %Y")
-                    modify_date = dt.strftime("%Y-%m-%d")
-                except:
-                    pass
-        # Clean up
-        for junk in content.select("#breadcrumbs, p.updated"):
-            junk.decompose()
-
-        # Build content blocks
-        blocks = []
-        for el in content.children:
-            if not hasattr(el, "name") or not el.name:
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=_FETCH_WORKERS) as fetchers, \
+            ProcessPoolExecutor(max_workers=min(len(links), os.cpu_count() or 1)) as renderers:
+        fetch_futures = {}
+        for idx, sec in enumerate(links, 1):
+            logger.info(f"[{idx}/{len(links)}] Processing: {sec['title']}")
+            fetch_futures[fetchers.submit(_fetch_section, fetch_soup, sec, logger)] = idx
+
+        # Hand each page to a render process as soon as its fetch completes
+        render_futures = {}
+        for future in as_completed(fetch_futures):
+            section = future.result()
+            if section:
+                page_title, page_url, blocks, modify_date = section
+                render = renderers.submit(build_pdf, page_title, blocks)
+                render_futures[render] = (fetch_futures[future], section)
+
+        for future in as_completed(render_futures):
+            idx, (page_title, page_url, _, modify_date) = render_futures[future]
+            try:
+                pdf_bytes = future.result()
+            except Exception as e:
+                logger.error(f"PDF generation failed for {page_title}: {e}")
                 continue
-
-            if el.name in ["h1", "h2", "h3"]:
-                txt = el.get_text(" ", strip=True)
-                if txt:
-                    blocks.append({"type": "heading", "text": txt})
-
-            elif el.name == "p":
-                txt = el.get_text(" ", strip=True)
-                if txt:
-                    blocks.append({"type": "paragraph", "text": txt})
-
-            elif el.name in ["ul", "ol"]:
-                for li in el.find_all("li", recursive=False):
-                    txt = li.get_text(" ", strip=True)
-                    if txt:
-                        blocks.append({"type": "bullet", "text": txt})
-
-            elif el.name == "table":
-                rows = []
-                for tr in el.find_all("tr"):
-                    row = [c.get_text(" ", strip=True) for c in tr.find_all(["td", "th"])]
-                    if any(c.strip() for c in row):
-                        rows.append(row)
-                if rows:
-                    blocks.append({"type": "table", "rows": rows})
-
-        # Generate PDF using only built-in fonts
-        try:
-            pdf = FPDF()
-            pdf.set_auto_page_break(auto=True, margin=15)
-            pdf.add_page()
-
-            # Title
-            pdf.set_font("Helvetica", "B", 16)
-            pdf.set_text_color(*TITLE_COLOR)
-            pdf.multi_cell(0, 10, safe_pdf_text(page_title))
-            pdf.ln(10)
-
-            for b in blocks:
-                if b["type"] == "heading":
-                    pdf.set_font("Helvetica", "B", 13)
-                    pdf.set_text_color(*TITLE_COLOR)
-                    pdf.multi_cell(0, 8, safe_pdf_text(b["text"]))
-                    pdf.ln(3)
-
-                elif b["type"] == "paragraph":
-                    pdf.set_font("Helvetica", size=11)
-                    pdf.set_text_color(0, 0, 0)
-                    pdf.multi_cell(0, 6, safe_pdf_text(b["text"]))
-                    pdf.ln(2)
-
-                elif b["type"] == "bullet":
-                    pdf.set_font("Helvetica", size=11)
-                    pdf.set_text_color(0, 0, 0)
-                    pdf.multi_cell(0, 6, f"· {safe_pdf_text(b['text'])}")
-                    pdf.ln(1)
-
-                elif b["type"] == "table" and b["rows"]:
-                    pdf.ln(4)
-                    col_count = max(len(r) for r in b["rows"])
-                    col_width = (pdf.w - 30) / col_count
-
-                    for r_idx, row in enumerate(b["rows"]):
-                        pdf.set_font("Helvetica", "B" if r_idx == 0 else "", 10)
-                        x = 15
-                        y = pdf.get_y()
-                        max_h = 0
-
-                        for cell in row:
-                            pdf.set_xy(x, y)
-                            cell_text = safe_pdf_text(cell)
-                            pdf.multi_cell(col_width, 7, cell_text, border=1, align="L")
-                            cell_h = pdf.get_y() - y
-                            max_h = max(max_h, cell_h)
-                            x += col_width
-
-                        pdf.set_xy(15, y + max_h)
-                    pdf.ln(5)
-
-            # Save to proper temp file
-            fd, temp_path = tempfile.mkstemp(suffix=".pdf", prefix="medsafe_nz_")
-            os.close(fd)
-            pdf.output(temp_path)
-            logger.info(f"PDF created: {temp_path}")
-
-        except Exception as e:
-            logger.error(f"PDF generation failed for {page_title}: {e}")
-            continue
-
-        items.append({
-            "title": page_title[: config.get("max_title_length", 250)],
-            "url": page_url,
-            "download_link": temp_path,
-            "local_path": temp_path,
-            "doc_format": "PDF",
-            "file_extension": "pdf",
-            "publish_date": modify_date or datetime.now().strftime("%Y-%m-%d"),
-            "modify_date": modify_date or datetime.now().strftime("%Y-%m-%d"),
-            "abstract": f"Medsafe New Zealand guidance: {page_title}"[:1000],
-            "atom_id": page_url,
-        })
+            logger.info(f"PDF created: {page_title} ({len(pdf_bytes)} bytes)")
+            results[idx] = {
+                "title": page_title[: config.get("max_title_length", 250)],
+                "url": page_url,
+                "file_bytes": pdf_bytes,
+                "doc_format": "PDF",
+                "file_extension": "pdf",
+                "publish_date": modify_date or datetime.now().strftime("%Y-%m-%d"),
+                "modify_date": modify_date or datetime.now().strftime("%Y-%m-%d"),
+                "abstract": f"Medsafe New Zealand guidance: {page_title}"[:1000],
+                "atom_id": page_url,
+            }
+
+    # Keep the listing order regardless of which section finished first
+    items = [results[idx] for idx in sorted(results)]
 
     logger.info(f"New Zealand complete – {len(items)} PDFs ready (all 7 should work now!)")
     return items
@@ -866,7 +1021,7 @@ def scrape_data(config, logger: logging.Logger):
 #             elif block["type"] == "paragraph":
 #                 pdf.set_font("Arial", "", 11)
 #                 pdf.set_text_color(0, 0, 0)
-#                 has_link = any("http" in line for line in block["text"].split("\n"))
+#                 has_link = "http" in block["text"]
 #                 if has_link:
 #                     pdf.set_text_color(*TITLE_COLOR)
 #                 pdf.multi_cell(0, 5, latin1_safe(block["text"]))
@@ -1148,7 +1303,7 @@ def scrape_data(config, logger: logging.Logger):
 #             elif block["type"] == "paragraph":
 #                 pdf.set_font("Arial", "", 11)
 #                 pdf.set_text_color(0, 0, 0)
-#                 has_link = any("http" in line for line in block["text"].split("\n"))
+#                 has_link = "http" in block["text"]
 #                 if has_link:
 #                     pdf.set_text_color(*TITLE_COLOR)
 #                 pdf.multi_cell(0, 6, latin1_safe(block["text"]))
@@ -1,11 +1,81 @@
+import asyncio
+import aiohttp
 import requests
-from bs4 import BeautifulSoup
-import logging
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import lxml.html
+from lxml import etree
 import os
-from datetime import datetime
 from urllib.parse import urljoin, urlparse
 
 
+# Document links looked for on inner pages (matched on the URL path only)
+DOC_EXTS = frozenset({".pdf", ".doc", ".docx"})
+
+# Extensions get_doc_format reports as-is (anything else is treated as pdf)
+_VALID_EXTS = frozenset({"pdf", "doc", "docx", "xls", "xlsx"})
+
+# Listing anchors with these extensions already are the document – no
+# landing page to visit
+DIRECT_EXTS = DOC_EXTS | {".xls", ".xlsx"}
+
+# Inner-page hrefs that mention .pdf/.doc in any case – libxml2 narrows the
+# anchors, DOC_EXTS then confirms the extension is on the path
+_DOC_HREF_XPATH = (
+    "//a/@href[contains(translate(., 'PDFOC', 'pdfoc'), '.pdf')"
+    " or contains(translate(., 'PDFOC', 'pdfoc'), '.doc')]"
+)
+
+# Title anchors of the listing rows kept by the strict filter: Medical
+# Devices (column 2) with a Guidance Document or Registration Requirement
+# category (column 3); one anchor – the first linked one in column 1 – per row
+_ANCHOR_XPATH = (
+    "//tr[td[2][contains(., 'Medical Devices')]"
+    " and td[3][contains(., 'Guidance Document') or contains(., 'Registration Requirement')]]"
+    "/td[1]/descendant::a[@href][1]"
+)
+
+# Descendant text nodes of an anchor (comments excluded, like bs4's get_text)
+_TEXT_NODES = etree.XPath(".//text()")
+
+# Inner document pages are fetched concurrently on one aiohttp session;
+# at most _FETCH_CONCURRENCY requests are in flight at a time
+_FETCH_CONCURRENCY = 20
+_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+# Inner pages answering these statuses are retried, backing off 0.3s, 0.6s
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_PAGE_ATTEMPTS = 3
+
+# Landing pages larger than this are not worth parsing for a single link
+_MAX_PAGE_BYTES = 5 * 1024 * 1024
+
+# page_url -> resolved document URL, kept for the life of the process. Only
+# pages that were fetched and parsed are cached, so failures are retried.
+_PDF_URL_CACHE = {}
+
+# Module-level session for the listing fetch: keep-alive connections to
+# nafdac.gov.ng are reused across scrape_data calls in the same process
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+    pool_connections=16,
+    pool_maxsize=32,
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.headers.update({"User-Agent": _USER_AGENT})
+
+
+def _title_text(el):
+    """
+    Anchor text exactly as BeautifulSoup's get_text(strip=True) built it:
+    every text node stripped, joined with no separator. NAFDAC items have
+    no atom_id, so the title feeds doc_hash and must not change format.
+    """
+    return "".join(s.strip() for s in _TEXT_NODES(el))
+
+
 def get_doc_format(link):
     """Detect extension safely."""
     if not link:
@@ -13,45 +83,108 @@ def get_doc_format(link):
 
     parsed = urlparse(link)
     ext = os.path.splitext(parsed.path.lower())[1].replace(".", "")
-    if ext in ["pdf", "doc", "docx", "xls", "xlsx"]:
+    if ext in _VALID_EXTS:
         return ext
     return "pdf"
 
 
-def extract_pdf_url(page_url, logger):
+def _is_document(headers):
+    """True when the response itself is the document (PDF or binary)."""
+    content_type = headers.get("Content-Type", "").lower()
+    return "pdf" in content_type or "octet-stream" in content_type
+
+
+def _skip_body(page_url, headers, logger):
     """
-    Visit inside page → extract real PDF URL.
-    Protected from binary / non-HTML errors.
+    Decide from the response headers alone whether the body needs reading:
+    True for non-HTML or oversized inner pages, which are not parsed.
     """
+    # BLOCK non-HTML content
+    if "html" not in headers.get("Content-Type", "").lower():
+        logger.warning(f"Non-HTML returned for inner page {page_url}, skipping parse.")
+        return True
+
+    length = headers.get("Content-Length", "")
+    if length.isdigit() and int(length) > _MAX_PAGE_BYTES:
+        logger.warning(f"Inner page {page_url} is {length} bytes, skipping parse.")
+        return True
+
+    return False
+
+
+async def extract_pdf_url_async(session, page_url, logger):
+    """
+    Visit inside page → extract real PDF URL, retrying 429/5xx with a short
+    backoff (or the server's Retry-After). Protected from binary / non-HTML
+    errors; used for the concurrent fan-out in scrape_data.
+    """
+    cached = _PDF_URL_CACHE.get(page_url)
+    if cached is not None:
+        return cached
+
     try:
-        resp = requests.get(page_url, timeout=30)
-        resp.raise_for_status()
+        for attempt in range(_PAGE_ATTEMPTS):
+            async with session.get(page_url) as resp:
+                if resp.status not in _RETRY_STATUSES or attempt == _PAGE_ATTEMPTS - 1:
+                    resp.raise_for_status()
+
+                    # Headers arrive before the body, so binaries are never
+                    # downloaded. The landing link may already be the document
+                    # (possibly after redirects)
+                    if _is_document(resp.headers):
+                        pdf_url = _PDF_URL_CACHE[page_url] = str(resp.url)
+                        return pdf_url
+                    if _skip_body(page_url, resp.headers, logger):
+                        return page_url
+
+                    body = await resp.read()
+                    break
+                retry_after = resp.headers.get("Retry-After", "")
+                delay = int(retry_after) if retry_after.isdigit() else 0.3 * 2 ** attempt
+            await asyncio.sleep(delay)
     except Exception as e:
         logger.error(f"Failed to open document page {page_url}: {e}")
         return page_url
 
-    # BLOCK non-HTML content
-    content_type = resp.headers.get("Content-Type", "").lower()
-    if "html" not in content_type:
-        logger.warning(f"Non-HTML returned for inner page {page_url}, skipping parse.")
-        return page_url
+    return _pdf_url_from_page(page_url, body, logger)
+
+
+async def _resolve_pdf_urls(page_urls, logger):
+    """Resolve every landing page concurrently; results keep page_urls order."""
+    # The connector's pool is the concurrency limit. Requests queue for a
+    # connection, so the timeouts are per socket operation – a total would
+    # also count the time spent waiting in that queue
+    connector = aiohttp.TCPConnector(limit=_FETCH_CONCURRENCY, limit_per_host=10, ttl_dns_cache=300)
+
+    async with aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(sock_connect=30, sock_read=30),
+        headers={"User-Agent": _USER_AGENT},
+    ) as session:
+        return await asyncio.gather(
+            *(extract_pdf_url_async(session, u, logger) for u in page_urls)
+        )
 
-    # Safe HTML parsing
+
+def _pdf_url_from_page(page_url, body, logger):
+    """Pick the first document link out of an inner page's HTML bytes."""
+    # Safe HTML parsing – hand over the raw bytes so charset detection and
+    # decoding happen inside the parser rather than through resp.text
     try:
-        soup = BeautifulSoup(resp.text, "html.parser")
-    except Exception:
-        try:
-            soup = BeautifulSoup(resp.content, "lxml")
-        except Exception as e:
-            logger.error(f"Parser failed on inner page {page_url}: {e}")
-            return page_url
-
-    # Look for PDF/DOC links
-    for a in soup.find_all("a", href=True):
-        href = a["href"].lower()
-        if any(href.endswith(ext) for ext in [".pdf", ".doc", ".docx"]):
-            return urljoin(page_url, a["href"])
+        hrefs = lxml.html.fromstring(body).xpath(_DOC_HREF_XPATH)
+    except Exception as e:
+        logger.error(f"Parser failed on inner page {page_url}: {e}")
+        return page_url
+
+    # Look for PDF/DOC links among the XPath candidates; only the path is
+    # lowercased, so query strings and fragments are never copied
+    for href in hrefs:
+        href = str(href)
+        if os.path.splitext(urlparse(href).path)[1].lower() in DOC_EXTS:
+            pdf_url = _PDF_URL_CACHE[page_url] = urljoin(page_url, href)
+            return pdf_url
 
+    _PDF_URL_CACHE[page_url] = page_url
     return page_url
 
 
@@ -68,7 +201,7 @@ def scrape_data(cfg, logger):
 
     # Fetch main page safely
     try:
-        response = requests.get(url, timeout=30)
+        response = _SESSION.get(url, timeout=30)
         response.raise_for_status()
     except Exception as e:
         logger.error(f"Failed to fetch page: {e}")
@@ -80,60 +213,57 @@ def scrape_data(cfg, logger):
         logger.error("Nigeria returned NON-HTML page. Skipping Nigeria scraping.")
         return []
 
-    # Safe parsing of main page
+    # Safe parsing of main page – the strict filter runs inside lxml, so only
+    # matching rows (and only they pay for an inner-page fetch) reach Python
     try:
-        soup = BeautifulSoup(response.text, "html.parser")
-    except Exception:
-        try:
-            soup = BeautifulSoup(response.content, "lxml")
-        except Exception as e:
-            logger.error(f"Nigeria main page parsing failed: {e}")
-            return []
-
-    rows = soup.select("tr")
-    raw_items = []
-
-    for row in rows:
-        cols = row.find_all("td")
-        if len(cols) < 3:
-            continue
+        anchors = lxml.html.fromstring(response.content).xpath(_ANCHOR_XPATH)
+    except Exception as e:
+        logger.error(f"Nigeria main page parsing failed: {e}")
+        return []
 
-        title_tag = cols[0].find("a")
-        if not title_tag:
-            continue
+    raw_items = []
+    candidates = []
 
-        title = title_tag.get_text(strip=True)
+    for title_tag in anchors:
+        title = _title_text(title_tag)
         relative_link = title_tag.get("href")
         if not relative_link:
             continue
 
         # Build full link
-        document_page_url = urljoin(url, relative_link)
-
-        # Extract actual document link
-        pdf_url = extract_pdf_url(document_page_url, logger)
-
-        product_type = cols[1].get_text(strip=True)
-        category = cols[2].get_text(strip=True)
-
-        if (
-            "Medical Devices" in product_type
-            and ("Guidance Document" in category or "Registration Requirement" in category)
-        ):
-            item = {
-                "title": title,
-                "url": pdf_url,
-                "document_type_id": cfg["document_type"],
-                "agency_id": cfg["agency_id"],
-                "program_id": cfg["program_id"],
-                "docket_prefix": cfg["docket_prefix"],
-                "publish_date": None,
-                "raw_content": None,
-                "doc_format": get_doc_format(pdf_url),
-            }
-
-            raw_items.append(item)
-            logger.info(f"Found Nigeria document: {title}")
+        candidates.append((title, urljoin(url, relative_link)))
+
+    # Extract actual document links – direct file links are used as-is and
+    # each distinct landing page is fetched once even when the listing repeats it
+    pdf_urls = {}
+    page_urls = {}
+    for _, page_url in candidates:
+        if page_url in pdf_urls or page_url in page_urls:
+            continue
+        if os.path.splitext(urlparse(page_url).path)[1].lower() in DIRECT_EXTS:
+            pdf_urls[page_url] = page_url
+        else:
+            page_urls[page_url] = None
+
+    if page_urls:
+        pdf_urls.update(zip(page_urls, asyncio.run(_resolve_pdf_urls(page_urls, logger))))
+
+    for title, document_page_url in candidates:
+        pdf_url = pdf_urls[document_page_url]
+        item = {
+            "title": title,
+            "url": pdf_url,
+            "document_type_id": cfg["document_type"],
+            "agency_id": cfg["agency_id"],
+            "program_id": cfg["program_id"],
+            "docket_prefix": cfg["docket_prefix"],
+            "publish_date": None,
+            "raw_content": None,
+            "doc_format": get_doc_format(pdf_url),
+        }
+
+        raw_items.append(item)
+        logger.info(f"Found Nigeria document: {title}")
 
     logger.info(f"Total Nigeria documents: {len(raw_items)}")
     return raw_items
@@ -1,4 +1,5 @@
 # utils/parallel_runner.py
+import functools
 import importlib
 import pathlib
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -10,9 +11,14 @@ def _load_country_module(country_file: pathlib.Path):
     module_name = f"scraper_pipeline.countries.{country_file.stem}"
     return importlib.import_module(module_name)
 
-def run_countries_parallel(max_workers: int = None) -> Dict[str, Any]:
+@functools.lru_cache(maxsize=None)
+def _country_modules():
+    """Discover and import the country modules once per process."""
     country_files = [p for p in COUNTRIES_DIR.glob("*.py") if p.name != "__init__.py"]
-    modules = [_load_country_module(p) for p in country_files]
+    return tuple(_load_country_module(p) for p in country_files)
+
+def run_countries_parallel(max_workers: int = None) -> Dict[str, Any]:
+    modules = _country_modules()
 
     results = {}
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
@@ -2,57 +2,82 @@
 import json
 import logging
 import sys
-import os
-import shutil
-import tempfile
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import functools
+import importlib
+import multiprocessing
+from logging.handlers import QueueListener
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback
+    orjson = None
 
 from config import Config
-from utils.logger import setup_logging
+from utils.logger import setup_logging, setup_worker_logging
 from utils.db_manager import DatabaseManager
 from utils.s3_manager import S3Manager
 
 
-def cleanup_temp_dirs(logger):
-    """Delete all temporary directories created during this pipeline run."""
-    temp_root = tempfile.gettempdir()
-    logger.info("Cleaning up temporary directories...")
-    try:
-        for name in os.listdir(temp_root):
-            path = os.path.join(temp_root, name)
-            if os.path.isdir(path) and name.startswith("tmp"):
-                try:
-                    shutil.rmtree(path, ignore_errors=True)
-                    logger.debug(f"Deleted: {path}")
-                except Exception as e:
-                    logger.warning(f"Could not delete {path}: {e}")
-    except Exception as e:
-        logger.warning(f"Failed to clean temp dirs: {e}")
+# Documents are written to the DB in batches of this size
+_DB_BATCH_SIZE = 500
+
+
+@functools.lru_cache(maxsize=1)
+def _load_countries():
+    """countries.json, parsed once per process."""
+    if orjson is not None:
+        with open('countries.json', 'rb') as f:
+            return orjson.loads(f.read())
+    with open('countries.json') as f:
+        return json.load(f)
+
+
+@functools.lru_cache(maxsize=None)
+def _country_module(code):
+    """Scraper module for a country code, resolved once per process."""
+    return importlib.import_module(f"countries.{code.lower()}")
 
 
 # --------------------------------------------------------------------- #
 # 1. Parallel per-country processing
 # --------------------------------------------------------------------- #
-def process_country(code, cfg, main_logger):
-    """Run scraper ->DB ->S3 for ONE country. Returns (code, processed_count)"""
+def _init_worker(log_queue):
+    """
+    ProcessPoolExecutor initializer. Under the spawn start method (Windows,
+    macOS) workers don't inherit main()'s stdout setup, so it is redone
+    here. The MAIN log goes through log_queue to main()'s listener, so
+    lines from different workers never interleave inside main.log.
+    """
+    sys.stdout.reconfigure(encoding='utf-8')
+    setup_worker_logging(log_queue)
+
+
+def process_country(code, cfg):
+    """
+    Run scraper ->DB ->S3 for ONE country. Returns (code, processed_count)
+    Runs in a worker process, so it sets up its own loggers.
+    """
     cfg['country'] = code
+    main_logger = setup_logging()
     logger = setup_logging(code)
 
     try:
         # ---- 1. Scrape -------------------------------------------------
-        mod = __import__(f"countries.{code.lower()}", fromlist=['scrape_data'])
-        raw_items = mod.scrape_data(cfg, logger)
+        # Async scrapers run their own event loop inside scrape_data
+        raw_items = _country_module(code).scrape_data(cfg, logger)
         if not raw_items:
             main_logger.warning(f"[{code}] No items scraped")
             return code, 0
 
         # ---- 2. DB + S3 ------------------------------------------------
         db = DatabaseManager(cfg)
-        s3 = S3Manager(cfg)
 
         items = db.assign_document_ids(raw_items, cfg)
-        processed = s3.process_documents(items)
-        db.save_documents(processed)
+        with S3Manager(cfg) as s3:
+            processed = s3.process_documents(items)
+        for i in range(0, len(processed), _DB_BATCH_SIZE):
+            db.save_documents(processed[i:i + _DB_BATCH_SIZE])
 
         main_logger.info(f"[{code}] finished – {len(processed)} docs")
         return code, len(processed)
@@ -69,35 +94,43 @@ def main():
     Config.validate()
     main_logger = setup_logging()          # main.log + console
 
-    with open('countries.json') as f:
-        countries = json.load(f)
+    countries = _load_countries()
 
     # ---- Parallel execution -----------------------------------------
+    # One process per country so HTML parsing / hashing use real cores;
+    # each worker can still use threads for its own network I/O. Scrapers
+    # mostly wait on the network, so every country gets a worker up front
+    # instead of being capped at the core count.
     max_workers = min(10, len(countries))   # tune as you like
     results = {}
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_code = {
-            executor.submit(process_country, code, cfg.copy(), main_logger): code
-            for code, cfg in countries.items()
-        }
-        for future in as_completed(future_to_code):
-            code = future_to_code[future]
-            try:
-                _, count = future.result()
-                results[code] = count
-            except Exception as exc:
-                main_logger.error(f"[{code}] generated an exception: {exc}")
-                results[code] = 0
+    # Workers' MAIN-log records are written by this process alone
+    log_queue = multiprocessing.Queue()
+    listener = QueueListener(log_queue, *main_logger.handlers, respect_handler_level=True)
+    listener.start()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(log_queue,)
+        ) as executor:
+            future_to_code = {
+                executor.submit(process_country, code, cfg.copy()): code
+                for code, cfg in countries.items()
+            }
+            for future in as_completed(future_to_code):
+                code = future_to_code[future]
+                try:
+                    _, count = future.result()
+                    results[code] = count
+                except Exception as exc:
+                    main_logger.error(f"[{code}] generated an exception: {exc}")
+                    results[code] = 0
+    finally:
+        listener.stop()
 
     # ---- Summary ----------------------------------------------------
     total = sum(results.values())
     main_logger.info(f"Pipeline completed – processed {total} documents across {len(results)} countries")
     main_logger.info("Country summary: " + ", ".join(f"{c}:{n}" for c, n in results.items()))
-        # ---- Final global cleanup --------------------------------------
-    main_logger.info("Cleaning up all temporary directories after pipeline...")
-    cleanup_temp_dirs(main_logger)
-    main_logger.info("All temporary directories cleaned successfully.")
 
 
 if __name__ == "__main__":
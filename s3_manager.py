@@ -1,15 +1,35 @@
 # utils/s3_manager.py
+import io
 import os
+import json
+import time
 import boto3
-import requests
+from boto3.s3.transfer import TransferConfig
+import httpx
 import tempfile
 import shutil
 import hashlib
 from urllib.parse import quote
 from config import Config
 import logging
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Documents of one country are downloaded/uploaded on this many threads
+_UPLOAD_WORKERS = 16
+
+# Download retries on these statuses and on connection errors, backing
+# off 1s, 2s, 4s, ... (the only retry layer – the transport doesn't retry)
+_RETRY_STATUSES = frozenset({403, 429, 500, 502, 503})
+_DOWNLOAD_ATTEMPTS = 5
+
+# _download result when the source answered 304 Not Modified
+NOT_MODIFIED = "not-modified"
+
+# Downloads are streamed into a spooled file: kept in memory up to this
+# size, then rolled over to disk, so 16 workers never hold 16 whole files
+_SPOOL_MAX_BYTES = 4 * 1024 * 1024
+_CHUNK_BYTES = 256 * 1024
 
 
 class S3Manager:
@@ -22,40 +42,212 @@ class S3Manager:
             aws_secret_access_key=Config.AWS_SECRET_KEY
         )
         self.bucket = Config.AWS_BUCKET
+        # Public URL prefix shared by every object of this manager
+        self._s3_url_prefix = f"https://{self.bucket}.s3.{Config.AWS_REGION}.amazonaws.com/"
+
+        # s3_key template and its per-country fields, resolved once
+        self._key_fmt = self.config['folder_structure']
+        self._key_base_args = {
+            'base': self.config['base_s3_folder'],
+            'country': self.config['s3_country_folder'].upper(),
+            'agency_sub': self.config['agency_sub'],
+        }
         self.logger = logging.getLogger(country_config.get('country', 'S3'))
 
+        # Files above 8 MB go up as parallel multipart chunks
+        self._transfer_cfg = TransferConfig(
+            multipart_threshold=8 * 1024 * 1024,
+            multipart_chunksize=8 * 1024 * 1024,
+            max_concurrency=8,
+            use_threads=True,
+        )
+
+        # One HTTP/2 client per manager: downloads from the same host are
+        # multiplexed over one TLS connection instead of a fresh handshake
+        self.http = httpx.Client(
+            transport=httpx.HTTPTransport(
+                http2=True,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            ),
+            timeout=60.0,
+            follow_redirects=True,
+        )
+
+        # source URL -> {etag, last_modified, s3_key} from earlier runs
+        self._validators_path = os.path.join(
+            Config.HTTP_CACHE_DIR, f"{country_config.get('country', 'S3')}.json"
+        )
+        self._validators = self._load_validators()
+
+    def close(self):
+        """Close the pooled HTTP/2 connections of the download client."""
+        self.http.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
     # --------------------------------------------------------------------- #
     # 1. Duplicate-aware upload
     # --------------------------------------------------------------------- #
-    def _file_md5(self, path, chunk_size=8192):
-        md5 = hashlib.md5()
+    def _file_md5(self, path, chunk_size=1024 * 1024):
+        # MD5 because it is what S3 reports as the ETag; not used for security
         with open(path, "rb") as f:
+            if hasattr(hashlib, "file_digest"):  # Python 3.11+, reads in C
+                return hashlib.file_digest(
+                    f, lambda: hashlib.md5(usedforsecurity=False)
+                ).hexdigest()
+            md5 = hashlib.md5(usedforsecurity=False)
             for chunk in iter(lambda: f.read(chunk_size), b""):
                 md5.update(chunk)
         return md5.hexdigest()
 
+    def _s3_unchanged(self, s3_key, md5):
+        """True if the object at s3_key already has this content (ETag == MD5)."""
+        # Multipart ETags ("<md5>-<parts>") never match, so those re-upload
+        try:
+            head = self.s3.head_object(Bucket=self.bucket, Key=s3_key)
+            if head["ETag"].strip('"') == md5:
+                self.logger.info(f"S3 object unchanged, upload skipped: {s3_key}")
+                return True
+        except self.s3.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] not in ("404", "NoSuchKey"):
+                self.logger.warning(f"Error checking existing object: {e}")
+        return False
+
     def upload_if_changed(self, local_path, s3_key):
         """
-        Always upload the file to S3 (overwrite if exists).
-        Returns True if uploaded.
+        Upload the file to S3 unless the object already there has the same
+        content (S3 ETag == local MD5). Returns True if uploaded.
         """
-        try:
-            # Try deleting existing object (optional, ensures clean overwrite)
-            self.s3.delete_object(Bucket=self.bucket, Key=s3_key)
-            self.logger.info(f"Deleted existing S3 object before upload: {s3_key}")
-        except self.s3.exceptions.ClientError as e:
-            if e.response["Error"]["Code"] != "404":
-                self.logger.warning(f"Error deleting existing object: {e}")
+        # ---- skip identical content ---------------------------------------
+        if self._s3_unchanged(s3_key, self._file_md5(local_path)):
+            return False
 
-        # ---- always upload ------------------------------------------------
-        self.s3.upload_file(local_path, self.bucket, s3_key)
-        s3_url = f"https://{self.bucket}.s3.{Config.AWS_REGION}.amazonaws.com/{quote(s3_key)}"
+        # ---- upload (PutObject replaces an existing key) ------------------
+        self.s3.upload_file(local_path, self.bucket, s3_key, Config=self._transfer_cfg)
         self.logger.info(f"S3 uploaded (overwrite or new): {s3_key}")
         return True
 
+    def upload_bytes(self, data, s3_key):
+        """
+        Upload an in-memory file (a PDF generated by the scraper) straight to
+        S3 without writing it to disk first.
+        Skipped, like upload_if_changed, when S3 already has the same bytes.
+        """
+        md5 = hashlib.md5(data, usedforsecurity=False).hexdigest()
+        return self.upload_fileobj(io.BytesIO(data), md5, s3_key)
+
+    def upload_fileobj(self, fileobj, md5, s3_key):
+        """
+        Upload a readable file object whose MD5 is already known (computed
+        while it was downloaded). Skipped when S3 already has that content.
+        """
+        if self._s3_unchanged(s3_key, md5):
+            return False
+
+        self.s3.upload_fileobj(fileobj, self.bucket, s3_key, Config=self._transfer_cfg)
+        self.logger.info(f"S3 uploaded: {s3_key}")
+        return True
+
+    # --------------------------------------------------------------------- #
+    # 2. Conditional-download cache (ETag / Last-Modified per source URL)
+    # --------------------------------------------------------------------- #
+    def _load_validators(self):
+        try:
+            with open(self._validators_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_validators(self):
+        try:
+            os.makedirs(os.path.dirname(self._validators_path) or ".", exist_ok=True)
+            tmp_path = f"{self._validators_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._validators, f)
+            os.replace(tmp_path, self._validators_path)
+        except OSError as e:
+            self.logger.warning(f"Could not save HTTP cache {self._validators_path}: {e}")
+
     # --------------------------------------------------------------------- #
-    # 2. Existing helpers (unchanged except using new upload)
+    # 3. Existing helpers (unchanged except using new upload)
     # --------------------------------------------------------------------- #
+    def _download(self, source, validators=None):
+        """
+        Stream an http(s) source into a SpooledTemporaryFile, hashing it on
+        the way. Returns (file rewound to 0, MD5 hex), None on failure, or
+        NOT_MODIFIED when validators (etag / last_modified from an earlier
+        run) made the server answer 304. On a fresh download, validators is
+        refilled from the response headers. The caller closes the file.
+        """
+        try:
+            self.logger.info(f"Downloading from URL: {source}")
+
+            headers = {
+                "User-Agent": (
+                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                    "AppleWebKit/537.36 (KHTML, like Gecko) "
+                    "Chrome/120.0 Safari/537.36"
+                )
+            }
+            if "diprece.minsal.cl" in source.lower():
+                self.logger.info("Applying Chile MoH headers")
+                headers.update({
+                    "Accept-Language": "es-CL,es;q=0.9,en;q=0.8",
+                    "Referer": "https://diprece.minsal.cl/"
+                })
+
+            if validators:
+                if validators.get("etag"):
+                    headers["If-None-Match"] = validators["etag"]
+                if validators.get("last_modified"):
+                    headers["If-Modified-Since"] = validators["last_modified"]
+
+            for attempt in range(_DOWNLOAD_ATTEMPTS):
+                last = attempt == _DOWNLOAD_ATTEMPTS - 1
+                try:
+                    with self.http.stream("GET", source, headers=headers) as resp:
+                        if resp.status_code in _RETRY_STATUSES and not last:
+                            resp.close()            # free the connection while we wait
+                            time.sleep(2 ** attempt)
+                            continue
+
+                        if resp.status_code == 304:
+                            self.logger.info(f"Not modified since last run: {source}")
+                            return NOT_MODIFIED
+                        resp.raise_for_status()
+
+                        if validators is not None:
+                            validators.clear()
+                            if resp.headers.get("ETag"):
+                                validators["etag"] = resp.headers["ETag"]
+                            if resp.headers.get("Last-Modified"):
+                                validators["last_modified"] = resp.headers["Last-Modified"]
+
+                        buf = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES)
+                        md5 = hashlib.md5(usedforsecurity=False)
+                        try:
+                            for chunk in resp.iter_bytes(_CHUNK_BYTES):
+                                md5.update(chunk)
+                                buf.write(chunk)
+                        except BaseException:
+                            buf.close()
+                            raise
+                        self.logger.info(f"Downloaded: {source} ({buf.tell()} bytes)")
+                        buf.seek(0)
+                        return buf, md5.hexdigest()
+                except httpx.TransportError:
+                    if last:
+                        raise
+                    time.sleep(2 ** attempt)
+
+        except Exception as e:
+            self.logger.error(f"Download failed: {e}")
+            return None
+
     def _prepare_local_file(self, source, dest_path):
         # … (exactly the same as you posted) …
             # (copy-paste your original implementation here – omitted for brevity)
@@ -63,129 +255,127 @@ class S3Manager:
             self.logger.error("No source provided")
             return False
 
-        if isinstance(source, str) and source.lower().startswith(('http://', 'https://')):
-            try:
-                self.logger.info(f"Downloading from URL: {source}")
-
-                session = requests.Session()
-                retry = Retry(total=5, backoff_factor=1,
-                              status_forcelist=[403, 429, 500, 502, 503],
-                              allowed_methods=["GET"])
-                session.mount("https://", HTTPAdapter(max_retries=retry))
-                session.mount("http://", HTTPAdapter(max_retries=retry))
-
-                headers = {
-                    "User-Agent": (
-                        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                        "AppleWebKit/537.36 (KHTML, like Gecko) "
-                        "Chrome/120.0 Safari/537.36"
-                    )
-                }
-                if "diprece.minsal.cl" in source.lower():
-                    self.logger.info("Applying Chile MoH headers")
-                    headers.update({
-                        "Accept-Language": "es-CL,es;q=0.9,en;q=0.8",
-                        "Referer": "https://diprece.minsal.cl/"
-                    })
-
-                resp = session.get(source, headers=headers, timeout=60, stream=True)
-                resp.raise_for_status()
-
-                with open(dest_path, 'wb') as f:
-                    for chunk in resp.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-
-                size = os.path.getsize(dest_path)
-                self.logger.info(f"Downloaded: {dest_path} ({size} bytes)")
-                return True
+        # local file – just copy
+        try:
+            # Ensure destination directory exists
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
 
-            except Exception as e:
-                self.logger.error(f"Download failed: {e}")
+            # Ensure source file actually exists
+            if not os.path.exists(source):
+                self.logger.error(f"Source file not found: {source}")
                 return False
 
-        else:
-            # local file – just copy
-            try:
-                # Ensure destination directory exists
-                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-
-                # Ensure source file actually exists
-                if not os.path.exists(source):
-                    self.logger.error(f"Source file not found: {source}")
-                    return False
-
-                shutil.copy2(source, dest_path)
-                self.logger.info(f"Copied local file: {source} -> {dest_path}")
-                return True
-
-            except Exception as e:
-                self.logger.error(f"Copy failed: {e}")
-                return False
+            shutil.copy2(source, dest_path)
+            self.logger.info(f"Copied local file: {source} -> {dest_path}")
+            return True
 
-    def process_documents(self, items):
-        processed = []
-        temp_dir = tempfile.mkdtemp()
-        self.logger.info(f"Temp directory: {temp_dir}")
+        except Exception as e:
+            self.logger.error(f"Copy failed: {e}")
+            return False
 
+    def _process_one_item(self, item, temp_dir):
+        """Download/upload one document; returns the updated item or None."""
         try:
-            for item in items:
-                try:
-                    doc_id = item.get('doc_id')
-
-                    # skip non-updated items
-                    if item.get('is_new') is False and item.get('needs_update') is False:
-                        self.logger.info(f"Skipping S3 upload (no update required): {doc_id}")
-                        continue
-
-                    ext = item.get('file_extension', 'pdf')
+            doc_id = item.get('doc_id')
+
+            # skip non-updated items
+            if item.get('is_new') is False and item.get('needs_update') is False:
+                self.logger.info(f"Skipping S3 upload (no update required): {doc_id}")
+                return None
+
+            ext = item.get('file_extension', 'pdf')
+            s3_key = self._key_fmt.format_map({
+                **self._key_base_args,
+                'docket_id': item.get('docket_id'),
+                'doc_id': item.get('doc_id'),
+                'ext': ext
+            })
+
+            # Scrapers that generate documents (e.g. New Zealand PDFs)
+            # hand over the bytes directly – no temp-file round-trip
+            file_bytes = item.pop('file_bytes', None)
+            if file_bytes is not None:
+                uploaded = self.upload_bytes(file_bytes, s3_key)
+            else:
+                source = (
+                    item.get('download_link') or 
+                    item.get('source_url') or
+                    item.get('local_path') or
+                    item.get('url')
+                )
+
+                if not source:
+                    self.logger.warning(f"No source found for {doc_id}, skipping")
+                    return None
+
+                if isinstance(source, str) and source.lower().startswith(('http://', 'https://')):
+                    # Existing documents already uploaded under this key
+                    # are fetched conditionally – a 304 skips the upload
+                    cached = self._validators.get(source)
+                    validators = {}
+                    if item.get('is_new') is False and cached and cached.get('s3_key') == s3_key:
+                        validators.update(cached)
+
+                    # Streamed into a spooled file and on to S3 – small
+                    # documents never touch the disk
+                    result = self._download(source, validators)
+                    if result is None:
+                        self.logger.warning(f"Failed to download file for {doc_id}")
+                        return None
+
+                    if result is NOT_MODIFIED:
+                        uploaded = False
+                    else:
+                        body, md5 = result
+                        with body:
+                            uploaded = self.upload_fileobj(body, md5, s3_key)
+                        if validators:
+                            self._validators[source] = {**validators, "s3_key": s3_key}
+                else:
                     local_path = os.path.join(temp_dir, f"{doc_id}.{ext}")
-
-                    source = (
-                        item.get('download_link') or 
-                        item.get('source_url') or
-                        item.get('local_path') or
-                        item.get('url')
-                    )
-
-                    if not source:
-                        self.logger.warning(f"No source found for {doc_id}, skipping")
-                        continue
-
                     if not self._prepare_local_file(source, local_path):
                         self.logger.warning(f"Failed to download/prepare file for {doc_id}")
-                        continue
-
-                    s3_key = self.config['folder_structure'].format(
-                        base=self.config['base_s3_folder'],
-                        country=self.config['s3_country_folder'].upper(),
-                        agency_sub=self.config['agency_sub'],
-                        docket_id=item.get('docket_id'),
-                        doc_id=item.get('doc_id'),
-                        ext=ext
-                    )
+                        return None
 
                     uploaded = self.upload_if_changed(local_path, s3_key)
+                    os.remove(local_path)
 
-                    # always update s3_url mapping
-                    s3_url = f"https://{self.bucket}.s3.{Config.AWS_REGION}.amazonaws.com/{quote(s3_key)}"
-                    item.update({
-                        "aws_key": s3_key,
-                        "s3_link_url": s3_url,
-                        "download_link": s3_url
-                    })
+            # always update s3_url mapping
+            s3_url = self._s3_url_prefix + quote(s3_key)
+            item.update({
+                "aws_key": s3_key,
+                "s3_link_url": s3_url,
+                "download_link": s3_url
+            })
+            return item
 
-                    processed.append(item)
-                    os.remove(local_path)
+        except Exception as e:
+            self.logger.error(f"Error processing document {item.get('doc_id')}: {e}")
+            return None
 
-                except Exception as e:
-                    self.logger.error(f"Error processing document {item.get('doc_id')}: {e}")
-                    continue
+    def process_documents(self, items):
+        processed = []
 
-            self.logger.info(f"Total documents processed: {len(processed)}")
-            return processed
+        # The temp dir (local-file copies only) is removed as soon as this
+        # country is done
+        with tempfile.TemporaryDirectory(prefix="s3mgr_") as temp_dir:
+            self.logger.info(f"Temp directory: {temp_dir}")
+
+            try:
+                # Each item is an independent download + upload, so run them on a
+                # thread pool; results are collected in the original item order
+                if items:
+                    with ThreadPoolExecutor(max_workers=min(_UPLOAD_WORKERS, len(items))) as executor:
+                        futures = [executor.submit(self._process_one_item, item, temp_dir) for item in items]
+                        for future in futures:
+                            item = future.result()
+                            if item is not None:
+                                processed.append(item)
+
+                self.logger.info(f"Total documents processed: {len(processed)}")
+                return processed
+
+            finally:
+                self._save_validators()
 
-        finally:
-            # no cleanup
-            pass
 
@@ -1,15 +1,56 @@
 # countries/sg.py 
-import requests  
-from bs4 import BeautifulSoup
+import asyncio
+import aiohttp
+import lxml.html
+from lxml import etree
 import logging
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-import time
-import random
-from utils.file_helper import normalize_date, get_doc_format
+from urllib.parse import urljoin
+from utils import http_cache
+from utils.file_helper import normalize_date, get_doc_format, node_text
 
 
-def scrape_data(config, logger):
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Bump whenever _parse_page output changes: it is part of the page-cache
+# key, so items cached by an older parser are not reused on a 304
+_PARSER_VERSION = 1
+
+# Per-section queries, compiled once. A section is the run of sibling
+# blocks after an <h2>, up to the next <h1>/<h2>.
+H2_XPATH = etree.XPath("//h2")
+# First <h3>/<strong> inside a block names its sub-topic
+SUB_HEAD_XPATH = etree.XPath("(.//h3 | .//strong)[1]")
+PDF_ANCHORS_XPATH = etree.XPath(
+    ".//a[contains(@href, '.pdf') or contains(@data-file, '.pdf') or contains(@data-href, '.pdf')]"
+)
+
+
+def _section_links(tree, logger):
+    """
+    Yield (outer_topic, sub_topic, anchor) for every PDF anchor inside an
+    <h2> section: each following sibling block up to the next <h1>/<h2>,
+    with the block's own first <h3>/<strong> (or the h2) as sub-topic.
+    """
+    for h2 in H2_XPATH(tree):
+        outer_topic = node_text(h2)
+        logger.info(f"MAIN TOPIC: {outer_topic}")
+
+        for block in h2.itersiblings():
+            if not isinstance(block.tag, str):  # comments, processing instructions
+                continue
+            if block.tag in ("h1", "h2"):
+                break
+
+            sub_heads = SUB_HEAD_XPATH(block)
+            sub_topic = node_text(sub_heads[0]) if sub_heads else outer_topic
+
+            for link in PDF_ANCHORS_XPATH(block):
+                yield outer_topic, sub_topic, link
+
+
+async def scrape_data_async(config, logger):
     """
     Scrape Singapore HSA Medical Devices Guidance Documents.
     Returns list of dicts compatible with the rest of the pipeline.
@@ -17,102 +58,97 @@ def scrape_data(config, logger):
     base_url = config["url"]
     logger.info(f"Scraping Singapore HSA: {base_url}")
 
-    items = []
-    session = requests.Session()
-    retries = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
-    session.mount('https://', HTTPAdapter(max_retries=retries))
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    })
-
-    # Fetch page
-    try:
-        res = session.get(base_url, timeout=30)
-        res.raise_for_status()
-    except Exception as e:
-        logger.error(f"Failed to fetch Singapore page: {e}")
-        return items
+    connector = aiohttp.TCPConnector(limit_per_host=64, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(
+        connector=connector,
+        headers=HEADERS,
+        timeout=aiohttp.ClientTimeout(total=30),
+    ) as session:
+        # Fetch page (conditional – unchanged pages reuse last run's items)
+        return await http_cache.fetch_items(
+            session, base_url, _parse_page, config, logger,
+            label="Singapore", logger=logger,
+            variant=http_cache.cache_variant(_PARSER_VERSION, config),
+        )
+
+
+def scrape_data(config, logger):
+    """Synchronous entry point used by the pipeline."""
+    return asyncio.run(scrape_data_async(config, logger))
+
 
-    soup = BeautifulSoup(res.text, "lxml")
-    sections = soup.select("h2")
+def _parse_page(html, config, logger):
+    """Extract the PDF items from the HSA guidance page HTML."""
+    items = []
+    base_url = config["url"]
+    tree = lxml.html.fromstring(html)
 
-    if not sections:
+    if not H2_XPATH(tree):
         logger.warning("No <h2> sections found on Singapore page.")
         return items
 
     total_pdfs = 0
-
-    for sec in sections:
-        outer_topic = sec.get_text(strip=True)
-        logger.info(f"MAIN TOPIC: {outer_topic}")
-
-        next_block = sec.find_next_sibling()
-
-        while next_block and next_block.name not in ["h2", "h1"]:
-            sub_head = next_block.select_one("h3, strong")
-            sub_topic = sub_head.get_text(strip=True) if sub_head else outer_topic
-
-            # Find PDF links
-            links = next_block.select("a[href*='.pdf'], a[data-file*='.pdf'], a[data-href*='.pdf']")
-
-            for link in links:
-                href = (
-                    link.get("href")
-                    or link.get("data-file")
-                    or link.get("data-href")
-                )
-
-                if not href:
-                    continue
-
-                # Resolve full URL
-                if href.startswith('/'):
-                    download_link = "https://www.hsa.gov.sg" + href
-                elif href.startswith('http'):
-                    download_link = href
-                else:
-                    continue
-
-                # Title
-                title = link.get_text(strip=True)
-                if not title:
-                    title = href.split('/')[-1].replace('.pdf', '').replace('_', ' ')
-
-                topic_full = (
-                    f"{outer_topic} - {sub_topic}"
-                    if sub_topic != outer_topic
-                    else outer_topic
-                )
-
-                if len(title) > 50:
-                    title = topic_full
-
-                # Extract file format & extension
-                ext, fmt_upper = get_doc_format(download_link)
-                if ext not in ['pdf']:
-                    logger.info(f"Skipping non-PDF: {ext} - {download_link}")
-                    continue
-
-                total_pdfs += 1
-                logger.info(f"[{total_pdfs}] Found: {title[:80]}...")
-
-                # Append final document
-                items.append({
-                    'title': title[:config.get('max_title_length', 200)],
-                    'url': download_link,             # <<<<<< UPDATED
-                    'download_link': download_link,
-                    'doc_format': fmt_upper,
-                    'file_extension': ext,
-                    'publish_date': None,
-                    'modify_date': None,
-                    'abstract': topic_full,
-                    'atom_id': download_link
-                })
-
-                # Delay to avoid blocking
-                time.sleep(random.uniform(0.5, 1.5))
-
-            next_block = next_block.find_next_sibling()
+    # The same PDF is often listed under more than one section
+    seen = set()
+
+    for outer_topic, sub_topic, link in _section_links(tree, logger):
+        href = (
+            link.get("href")
+            or link.get("data-file")
+            or link.get("data-href")
+        )
+
+        if not href:
+            continue
+
+        # Resolve full URL (absolute, root-relative and page-relative alike)
+        download_link = urljoin(base_url, href)
+        if not download_link.startswith(("http://", "https://")):
+            continue
+        if download_link in seen:
+            continue
+        seen.add(download_link)
+
+        # Title
+        title = node_text(link)
+        if not title:
+            title = href.split('/')[-1].replace('.pdf', '').replace('_', ' ')
+
+        topic_full = (
+            f"{outer_topic} - {sub_topic}"
+            if sub_topic != outer_topic
+            else outer_topic
+        )
+
+        if len(title) > 50:
+            title = topic_full
+
+        # Extract file format & extension – the XPath only matches .pdf links,
+        # so only URLs that don't end in .pdf (query strings etc.) need parsing
+        if download_link.lower().endswith(".pdf"):
+            ext, fmt_upper = "pdf", "PDF"
+        else:
+            ext, fmt_upper = get_doc_format(download_link)
+        if ext != "pdf":
+            logger.info(f"Skipping non-PDF: {ext} - {download_link}")
+            continue
+
+        total_pdfs += 1
+        # Lazy %-formatting – skipped entirely when INFO is filtered out
+        logger.info("[%d] Found: %.80s...", total_pdfs, title)
+
+        # Append final document
+        items.append({
+            'title': title[:config.get('max_title_length', 200)],
+            'url': download_link,             # <<<<<< UPDATED
+            'download_link': download_link,
+            'doc_format': fmt_upper,
+            'file_extension': ext,
+            'publish_date': None,
+            'modify_date': None,
+            'abstract': topic_full,
+            'atom_id': download_link
+        })
 
     logger.info(f"Singapore scraping complete. Found {len(items)} documents.")
     return items
@@ -126,6 +162,7 @@ def scrape_data(config, logger):
 
 
 
+
 # # countries/sg.py woking good 
 # import requests
 # from bs4 import BeautifulSoup
@@ -6,14 +6,36 @@ Fetches the JAZMP Guidelines page and extracts all PDF links.
 
 import os
 import re
+import asyncio
 import logging
 from datetime import datetime
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
 
-import requests
+import aiohttp
 from bs4 import BeautifulSoup
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from utils import http_cache
+
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept-Language": "en-US,en;q=0.9,sl;q=0.8",
+}
+
+# Bump whenever _parse_page output changes: it is part of the page-cache
+# key, so items cached by an older parser are not reused on a 304
+_PARSER_VERSION = 1
+
+# Title clean-up patterns, compiled once
+_RE_PDF_EXT = re.compile(r"\.pdf$", re.I)
+_RE_UNDERSCORE = re.compile(r"[_-]")
+# Characters Windows forbids in file names (-> "_") or a whitespace run
+# (-> " "), replaced in one pass
+_RE_TITLE_CLEAN = re.compile(r'(?P<bad>[<>:"/\\|?*])|\s+')
+
+
+def _title_repl(m):
+    return "_" if m.lastgroup == "bad" else " "
 
 
 # ----------------------------------------------------------------------
@@ -27,6 +49,11 @@ def _today_iso():
 # Main entry point required by the pipeline
 # ----------------------------------------------------------------------
 def scrape_data(config, logger: logging.Logger):
+    """Synchronous entry point – runs scrape_data_async on its own loop."""
+    return asyncio.run(scrape_data_async(config, logger))
+
+
+async def scrape_data_async(config, logger: logging.Logger):
     """
     Scrape JAZMP guidelines page for PDFs.
 
@@ -43,58 +70,80 @@ def scrape_data(config, logger: logging.Logger):
     base_url = config["url"]
     logger.info(f"Scraping Slovenia – JAZMP ({base_url})")
 
-    items = []
-
     # ------------------------------------------------------------------
     # 1. Session with retry
     # ------------------------------------------------------------------
-    session = requests.Session()
-    retry = Retry(total=5, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
-    session.mount("https://", HTTPAdapter(max_retries=retry))
-    session.headers.update({
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-        "Accept-Language": "en-US,en;q=0.9,sl;q=0.8",
-    })
-
-    # ------------------------------------------------------------------
-    # 2. Fetch page
-    # ------------------------------------------------------------------
-    try:
-        resp = session.get(base_url, timeout=30)
-        resp.raise_for_status()
-    except Exception as e:
-        logger.error(f"Failed to fetch JAZMP page: {e}")
-        return items
-
-    soup = BeautifulSoup(resp.text, "html.parser")
+    connector = aiohttp.TCPConnector(limit_per_host=64, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(
+        connector=connector,
+        headers=HEADERS,
+        timeout=aiohttp.ClientTimeout(total=30),
+    ) as session:
+        # ------------------------------------------------------------------
+        # 2. Fetch page (conditional – unchanged pages reuse last run's items)
+        # ------------------------------------------------------------------
+        return await http_cache.fetch_items(
+            session, base_url, _parse_page, base_url, config, logger,
+            label="JAZMP", logger=logger,
+            variant=http_cache.cache_variant(_PARSER_VERSION, config),
+        )
+
+
+def _parse_page(html, base_url, config, logger):
+    """Extract the PDF items from the JAZMP guidelines page HTML."""
+    items = []
+    soup = BeautifulSoup(html, "lxml")
 
     # ------------------------------------------------------------------
     # 3. Find all PDF links
     # ------------------------------------------------------------------
-    pdf_links = soup.find_all("a", href=lambda h: h and h.lower().endswith(".pdf"))
+    # Case-insensitive suffix match, compiled once by soupsieve
+    pdf_links = soup.select('a[href$=".pdf" i]')
     if not pdf_links:
         logger.warning("No PDFs found on JAZMP page")
         return items
 
     logger.info(f"Found {len(pdf_links)} PDF(s)")
 
+    # The same PDF can be linked from several places on the page
+    seen = set()
+
+    # base_url is split once; urljoin only handles the unusual hrefs
+    parts = urlsplit(base_url)
+    scheme_host = f"{parts.scheme}://{parts.netloc}"
+    base_dir = scheme_host + parts.path.rsplit("/", 1)[0] + "/"
+
     # ------------------------------------------------------------------
     # 4. Process each link
     # ------------------------------------------------------------------
     for idx, link in enumerate(pdf_links, start=1):
         try:
+            href = link["href"]
+            if href.startswith(("http://", "https://")):
+                pdf_url = href
+            elif "./" in href or ":" in href or href.startswith(("//", "?", "#")):
+                pdf_url = urljoin(base_url, href)
+            elif href.startswith("/"):
+                pdf_url = scheme_host + href
+            else:
+                pdf_url = base_dir + href
+            if pdf_url in seen:
+                continue
+            seen.add(pdf_url)
+
             title = link.get_text(strip=True)
             if not title:
                 # Fallback: extract from URL
-                filename = os.path.basename(link["href"].split("?")[0])
-                title = re.sub(r"\.pdf$", "", filename, flags=re.I)
-                title = re.sub(r"[_-]", " ", title)
+                filename = os.path.basename(href.split("?")[0])
+                title = _RE_PDF_EXT.sub("", filename)
+                title = _RE_UNDERSCORE.sub(" ", title)
 
-            pdf_url = urljoin(base_url, link["href"])
+            # Anchors can carry kilobytes of tooltip text; only the first
+            # few hundred characters can survive the caps below
+            title = title[: max(150, config.get("max_title_length", 250))]
 
             # Clean title
-            clean_title = re.sub(r'[<>:"/\\|?*]', '_', title)
-            clean_title = re.sub(r"\s+", " ", clean_title).strip()
+            clean_title = _RE_TITLE_CLEAN.sub(_title_repl, title).strip()
             if len(clean_title) > 150:
                 clean_title = clean_title[:150]
 
@@ -113,7 +162,8 @@ def scrape_data(config, logger: logging.Logger):
                 "atom_id": pdf_url,              # unique ID
             })
 
-            logger.info(f"[{idx}] {clean_title[:70]}...")
+            # Lazy %-formatting – skipped entirely when INFO is filtered out
+            logger.info("[%d] %.70s...", idx, clean_title)
 
         except Exception as e:
             logger.warning(f"Error processing PDF link {idx}: {e}")
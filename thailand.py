@@ -7,17 +7,43 @@ URL (from countries.json): https://en.fda.moph.go.th/...
 Pagination: ?ppp=20&page=N
 """
 
+import re
+import asyncio
 import logging
 from urllib.parse import urljoin, urlencode
 
-import requests
-from bs4 import BeautifulSoup
+import httpx
+import lxml.html
+from lxml import etree
 
-from utils.file_helper import normalize_date, clean_title
+from utils import http_cache
+from utils.file_helper import normalize_date, clean_title, node_text
 
 
 BASE_URL = "https://en.fda.moph.go.th"
 
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Listing pages are fetched this many at a time
+_PAGE_BATCH = 10
+
+# Bump whenever _parse_page output changes: it is part of the page-cache
+# key, so items cached by an older parser are not reused on a 304
+_PARSER_VERSION = 1
+
+# Page number in a pager link (…?ppp=20&page=7)
+_PAGE_PARAM = re.compile(r"[?&]page=(\d+)")
+
+# Listing queries, compiled once; the anchor test is CSS a[href$='.pdf']
+# (XPath 1.0 has no ends-with)
+_PAGER_HREFS = etree.XPath("//a[contains(@href, 'page=')]/@href")
+_ROWS = etree.XPath("//table//tbody//tr")
+_ROW_CELLS = etree.XPath(".//td")
+_PDF_HREFS = etree.XPath(
+    ".//a[substring(@href, string-length(@href) - 3) = '.pdf']/@href"
+)
+
 
 def _build_page_url(page: int = 1) -> str:
     """Create the full URL for a given page (ppp=20)."""
@@ -25,98 +51,248 @@ def _build_page_url(page: int = 1) -> str:
     return f"{BASE_URL}/cat2-health-products/category/health-products-medical-devices?{urlencode(params)}"
 
 
+async def _fetch_page(client, url, variant, attempts=3):
+    """
+    Conditional GET of url, retrying 429/5xx with 0.3s/0.6s backoff.
+    Returns (status, body bytes, response headers); body is None on a 304.
+    """
+    headers = http_cache.conditional_headers(url, variant)
+    for attempt in range(attempts):
+        resp = await client.get(url, headers=headers)
+        if resp.status_code not in RETRY_STATUSES or attempt == attempts - 1:
+            # httpx raises for every non-2xx, 304 included
+            if resp.status_code == 304:
+                return resp.status_code, None, resp.headers
+            resp.raise_for_status()
+            return resp.status_code, resp.content, resp.headers
+        await asyncio.sleep(0.3 * 2 ** attempt)
+
+
+async def _page_items(page, fetched, variant, cfg, logger, total_pdfs=0):
+    """
+    (items, last page) for a fetched listing page – parsed from a 200, or
+    last run's result when the page answered 304.
+    """
+    url = _build_page_url(page)
+    status, body, resp_headers = fetched
+    if status == 304:
+        cached = http_cache.load_items(url, variant)
+        if cached is None:
+            logger.warning(f"Page {page} not modified but its cached items are gone")
+            return [], None
+        logger.debug(f"Page {page} not modified – reusing {len(cached['items'])} cached documents")
+        return cached["items"], cached["last_page"]
+
+    # Parsing is CPU work – keep it off the event loop
+    page_items, last_page = await asyncio.to_thread(_parse_page, body, cfg, logger, total_pdfs)
+    if page_items:
+        logger.info(f"Page {page}: {len(page_items)} PDFs")
+        http_cache.store(url, resp_headers, {"items": page_items, "last_page": last_page}, variant)
+    return page_items, last_page
+
+
+def _add_new(items, seen, page_items):
+    """Append the page items whose PDF URL is not in seen yet; returns how many were new."""
+    added = 0
+    for item in page_items:
+        if item["atom_id"] in seen:
+            continue
+        seen.add(item["atom_id"])
+        items.append(item)
+        added += 1
+    return added
+
+
+def _fetch_pages(client, pages, variant):
+    """Start fetching the given page numbers concurrently; returns one task per page."""
+    return [asyncio.create_task(_fetch_page(client, _build_page_url(p), variant)) for p in pages]
+
+
+async def _collect_pages(pages, tasks, items, seen, variant, cfg, logger):
+    """
+    Parse pages in page order into items as soon as each one has arrived,
+    so parsing page N overlaps the download of the pages after it.
+    Returns (more, last_page): more is False once pagination should stop
+    (failed, empty or PDF-less page, or one that only repeats PDFs already
+    collected); last_page is the highest page number any pager showed.
+    """
+    last_page = None
+    try:
+        for p, task in zip(pages, tasks):
+            try:
+                fetched = await task
+            except Exception as e:
+                logger.error(f"Page {p} request failed: {e}")
+                return False, last_page
+
+            page_items, page_last = await _page_items(p, fetched, variant, cfg, logger, len(items))
+            if page_last:
+                last_page = max(last_page or 0, page_last)
+            if page_items is None:
+                logger.info(f"No rows on page {p} – ending pagination")
+                return False, last_page
+            if not page_items:
+                logger.info(f"No PDFs on page {p} – stopping")
+                return False, last_page
+            if not _add_new(items, seen, page_items):
+                logger.info(f"Page {p} only repeats earlier PDFs – pagination has looped")
+                return False, last_page
+        return True, last_page
+    finally:
+        # Pages past a stop are not needed; failures among them are not
+        # errors. Wait for the cancellations so no request outlives the client
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
 def scrape_data(cfg, logger: logging.Logger):
+    """Synchronous entry point – runs scrape_data_async on its own loop."""
+    return asyncio.run(scrape_data_async(cfg, logger))
+
+
+async def scrape_data_async(cfg, logger: logging.Logger):
     """
     Scrape **all** pages of Thailand FDA medical-device guidance PDFs.
 
-    Uses the `url` from `countries.json` as the *first* page.
-    Stops when a page returns no rows or no PDFs.
+    Page 1 is fetched first. Every page the pagers have shown so far is
+    requested at once; each page's pager can reveal more (windowed pagers
+    only list a few numbers). Past the highest known page, pages are probed
+    _PAGE_BATCH at a time until one fails, has no rows or PDFs, or only
+    repeats PDFs already collected.
     """
     logger.info("Scraping FDA THAI – Medical Devices Guidance")
 
-    session = requests.Session()
-    session.headers.update(
-        {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-    )
-
     items = []
-    page = 1
-    total_pdfs = 0
-
-    while True:
-        url = _build_page_url(page)
-        logger.debug(f"Fetching page {page}: {url}")
-
+    # PDF URLs already collected – pinned documents show up on several pages
+    seen = set()
+    # Page-cache key part: parser version + this country's config
+    variant = http_cache.cache_variant(_PARSER_VERSION, cfg)
+
+    # HTTP/2: concurrent page requests are multiplexed over one TLS connection
+    async with httpx.AsyncClient(
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(max_connections=_PAGE_BATCH),
+        ),
+        headers=HEADERS,
+        timeout=30.0,
+        follow_redirects=True,
+    ) as client:
         try:
-            resp = session.get(url, timeout=30)
-            resp.raise_for_status()
+            first = await _fetch_page(client, _build_page_url(1), variant)
         except Exception as e:
-            logger.error(f"Page {page} request failed: {e}")
-            break
-
-        soup = BeautifulSoup(resp.text, "lxml")
-        rows = soup.select("table tbody tr")
-
-        if not rows:
-            logger.info(f"No rows on page {page} – ending pagination")
-            break
-
-        page_has_pdf = False
-        for row_idx, row in enumerate(rows, 1):
-            cols = row.find_all("td")
-            if len(cols) < 4:
-                continue
-
-            # ---- Title (column 1) ----
-            title = cols[1].get_text(strip=True).strip()
-            if not title:
-                continue
-
-            # ---- PDF link (column 3) ----
-            pdf_anchor = cols[3].select_one("a[href$='.pdf']")
-            if not pdf_anchor:
-                continue
-
-            pdf_href = pdf_anchor.get("href")
-            pdf_url = urljoin(BASE_URL, pdf_href)  # full media.php URL
-
-            # ---- Date (column 0 – sometimes a number, sometimes a date) ----
-            date_raw = cols[0].get_text(strip=True)
-            publish_date = normalize_date(date_raw) or None
-            modify_date = publish_date
-
-            total_pdfs += 1
-            page_has_pdf = True
-
-            logger.info(f"[{total_pdfs}] {title[:70]}...")
-
-            # -----------------------------
-            # UPDATED: url is now pdf_url
-            # -----------------------------
-            items.append(
-                {
-                    "title": clean_title(title)[: cfg.get("max_title_length", 200)],
-                    "url": pdf_url,                   # Updated field
-                    "download_link": pdf_url,
-                    "doc_format": "PDF",
-                    "file_extension": "pdf",
-                    "publish_date": publish_date,
-                    "modify_date": modify_date,
-                    "abstract": f"TFDA guidance: {title}",
-                    "atom_id": pdf_url,               # unique for deduplication
-                }
+            logger.error(f"Page 1 request failed: {e}")
+            return items
+
+        page_items, last_page = await _page_items(1, first, variant, cfg, logger)
+        if not page_items:
+            logger.info("No rows or PDFs on page 1 – nothing to scrape")
+            return items
+        _add_new(items, seen, page_items)
+
+        page = 2
+        while True:
+            if last_page and page <= last_page:
+                # Pages the pager has shown – all at once
+                pages = range(page, last_page + 1)
+            else:
+                # Beyond any pager – probe a batch
+                pages = range(page, page + _PAGE_BATCH)
+            logger.debug(f"Fetching pages {pages.start}-{pages.stop - 1}")
+            more, seen_last = await _collect_pages(
+                pages, _fetch_pages(client, pages, variant), items, seen, variant, cfg, logger
             )
-
-        if not page_has_pdf:
-            logger.info(f"No PDFs on page {page} – stopping")
-            break
-
-        page += 1
+            if not more:
+                break
+            page = pages.stop
+            if seen_last:
+                last_page = max(last_page or 0, seen_last)
 
     logger.info(f"FDA THAI scraping complete – {len(items)} PDFs collected")
     return items
 
 
+def _last_page(tree):
+    """Highest ?page=N in the listing's pager links, or None without a pager."""
+    numbers = [
+        int(m.group(1))
+        for href in _PAGER_HREFS(tree)
+        if (m := _PAGE_PARAM.search(href))
+    ]
+    return max(numbers, default=None)
+
+
+def _parse_page(html, cfg, logger, total_pdfs=0):
+    """
+    Extract the PDF items from one listing page.
+    Returns (items, last page number from the pager or None); items is
+    None when the page has no table rows at all.
+    """
+    # Raw bytes – lxml detects the charset and builds the tree in C
+    tree = lxml.html.fromstring(html)
+    last_page = _last_page(tree)
+    rows = _ROWS(tree)
+    if not rows:
+        return None, last_page
+
+    items = []
+    max_title_length = cfg.get("max_title_length", 200)
+    for row_idx, row in enumerate(rows, 1):
+        cols = _ROW_CELLS(row)
+        if len(cols) < 4:
+            continue
+
+        # ---- Title (column 1) ----
+        title = node_text(cols[1])
+        if not title:
+            continue
+
+        # ---- PDF link (column 3) ----
+        pdf_hrefs = _PDF_HREFS(cols[3])
+        if not pdf_hrefs:
+            continue
+
+        # Full media.php URL – links are root-relative, so a plain prefix
+        # covers them; urljoin is kept for anything unusual
+        pdf_href = str(pdf_hrefs[0])
+        if pdf_href.startswith(("http://", "https://")):
+            pdf_url = pdf_href
+        elif pdf_href.startswith("/") and not pdf_href.startswith("//") and "./" not in pdf_href:
+            pdf_url = BASE_URL + pdf_href
+        else:
+            pdf_url = urljoin(BASE_URL, pdf_href)
+
+        # ---- Date (column 0 – sometimes a number, sometimes a date) ----
+        date_raw = node_text(cols[0])
+        publish_date = normalize_date(date_raw) or None
+        modify_date = publish_date
+
+        total_pdfs += 1
+
+        # Per-row detail is DEBUG (and lazy); each page logs one INFO summary
+        logger.debug("[%d] %.70s...", total_pdfs, title)
+
+        # -----------------------------
+        # UPDATED: url is now pdf_url
+        # -----------------------------
+        items.append(
+            {
+                "title": clean_title(title)[:max_title_length],
+                "url": pdf_url,                   # Updated field
+                "download_link": pdf_url,
+                "doc_format": "PDF",
+                "file_extension": "pdf",
+                "publish_date": publish_date,
+                "modify_date": modify_date,
+                "abstract": f"TFDA guidance: {title}",
+                "atom_id": pdf_url,               # unique for deduplication
+            }
+        )
+
+    return items, last_page
+
+
 
 
 